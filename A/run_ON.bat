@@ -28,7 +28,7 @@ if not exist "..\_system\venv\Scripts\activate.bat" goto :setup
 
 REM Check 3: Required packages installed
 call ..\_system\venv\Scripts\activate.bat
-python -c "import playwright, pandas, openpyxl" >nul 2>&1
+python -c "import playwright, openpyxl" >nul 2>&1
 if errorlevel 1 goto :setup
 
 REM All checks passed, skip to run
@@ -53,7 +53,7 @@ call ..\_system\venv\Scripts\activate.bat
 
 echo Installing dependencies...
 pip install --upgrade pip --quiet
-pip install playwright pandas openpyxl --quiet
+pip install playwright openpyxl --quiet
 
 echo Installing browser - this may take a minute...
 playwright install chromium
@@ -1,7 +1,8 @@
 """
 Toggle Status Checker
 Logs in once and checks the current state of toggles for all URLs.
-Uses batch processing for reliability with large number of URLs.
+Checks URLs concurrently on a fixed pool of tabs (async Playwright): a new URL
+starts as soon as any tab is free, so one slow page never holds up the rest.
 Outputs results to Excel file.
 
 Excel format:
@@ -10,31 +11,195 @@ URL | userid | password
 Usage:
 python check_status.py "ToggleExcel_A.xlsx" --no-headless
 python check_status.py "ToggleExcel_B.xlsx" --no-headless
+python check_status.py "ToggleExcel_A.xlsx" --cdp-endpoint http://localhost:9222
+python check_status.py "ToggleExcel_A.xlsx" --max-pages 5
+python check_status.py "ToggleExcel_A.xlsx" --profile-dir
 """
 
-import pandas as pd
-from playwright.sync_api import sync_playwright
+import openpyxl
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 import argparse
+import asyncio
+import csv
+import hashlib
 import logging
+import logging.handlers
+import time
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
 import os
 import platform
+import queue
+import re
 import subprocess
+from urllib.parse import urlsplit
+
+# Optional: faster event loop for the Playwright driver connection (pip install uvloop)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Setup logging: the hot path only enqueues records; a background thread writes them
+# to the log file and the console
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+log_file_handler = logging.FileHandler(f'status_check_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
+log_console_handler = logging.StreamHandler()
+for log_handler in (log_file_handler, log_console_handler):
+    log_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(log_queue, log_file_handler, log_console_handler)
+log_listener.start()
+log_queue_handler = logging.handlers.QueueHandler(log_queue)
+# Pass the bare message on; LOG_FORMAT is applied once, by the listener's handlers
+log_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[log_queue_handler])
+logger = logging.getLogger(__name__)
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f'status_check_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'),
-        logging.StreamHandler()
-    ]
+# Maximum number of tabs driven concurrently (size of the reusable page pool)
+MAX_PARALLEL_PAGES = 10
+
+# Results are appended here as each URL finishes, so a crashed run still leaves its
+# results on disk; the file is removed once the Excel report has been written
+RESULTS_CSV = "status_report.csv"
+RESULT_FIELDS = ['url', 'url_short', 'toggle_status', 'message', 'checked_at']
+
+# Minimum seconds between progress bar redraws (concurrent pages would otherwise redraw it constantly)
+PROGRESS_INTERVAL = 0.1
+last_progress_print = 0.0
+
+# Saved login session (cookies/local storage), one file per login, reused by runs within
+# SESSION_MAX_AGE_HOURS. Same naming as toggle_automation.py, so the two scripts share sessions
+SESSION_FILE_TEMPLATE = ".ft_session_{}.json"
+SESSION_MAX_AGE_HOURS = 12
+
+# Default folder for --profile-dir; keeps cookies, HTTP cache and compiled JS between runs.
+# Each login gets its own profile in a subfolder named by login_key()
+DEFAULT_PROFILE_DIR = Path.home() / ".fasttoggle_profile"
+
+# A redirect to one of these paths means the session is not logged in (no DOM check needed).
+# Matched against the URL path only, so e.g. ?next=/auth/... on a logged-in page does not count
+LOGIN_URL_PATTERN = re.compile(r'/(login|signin|sign-in|auth|sso)(/|$)', re.IGNORECASE)
+
+# Login page selectors. Each is a union, resolved in a single browser round-trip
+LOGIN_INDICATORS_SELECTOR = 'input[type="password"], form[action*="login"], form[action*="signin"]'
+USERNAME_SELECTOR = ':is(input[placeholder*="email" i], input[type="email"], input[name="email"])'
+PASSWORD_SELECTOR = ':is(input[placeholder*="password" i], input[type="password"])'
+SUBMIT_SELECTOR = ':is(button:has-text("Login"), button:has-text("Log in"), button[type="submit"])'
+
+# Pendo popup close buttons, matched in a single query
+PENDO_DISMISS_SELECTOR = ', '.join([
+    '[id^="pendo-close-guide-"]',
+    '[data-pendo-close-guide]',
+    'button._pendo-close-guide',
+    '._pendo-close-guide',
+    '[class*="pendo"] button[aria-label*="close" i]',
+    '[class*="pendo"] [class*="close"]',
+    '#pendo-base button',
+    '._pendo-step-container button',
+])
+
+# Label next to the toggle checkbox
+TOGGLE_LABEL = "In-app event postbacks"
+
+# Finds the checkbox next to the label and returns its state (null until it exists).
+# Also returns a CSS selector for the label's container ("hint"); on later pages the
+# hint is tried first, which is much cheaper than walking every text node.
+TOGGLE_STATE_JS = """({label, hint}) => {
+    if (!document.body) return null;
+    const read = (container) => {
+        const checkbox = container && container.querySelector('input[type="checkbox"]');
+        if (!checkbox) return null;
+        const classes = [...container.classList].map(c => '.' + CSS.escape(c)).join('');
+        return {checked: checkbox.checked, hint: container.tagName.toLowerCase() + classes};
+    };
+    if (hint) {
+        for (const container of document.querySelectorAll(hint)) {
+            if (![...container.children].some(el => el.textContent.trim() === label)) continue;
+            const state = read(container);
+            if (state) return state;
+        }
+    }
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        if (walker.currentNode.nodeValue.trim() !== label) continue;
+        const state = read(walker.currentNode.parentElement.parentElement);
+        if (state) return state;
+    }
+    return null;
+}"""
+
+# What the first page shows once it has rendered: 'toggle' (the session is valid, so the
+# login check is skipped) or 'login'; false until either appears
+FIRST_PAGE_KIND_JS = f"""({{label, loginSelector}}) => {{
+    if (({TOGGLE_STATE_JS})({{label, hint: null}})) return 'toggle';
+    return document.querySelector(loginSelector) ? 'login' : false;
+}}"""
+
+# Requests not needed to read the toggle are aborted to speed up page loads.
+# The toggle is read from the DOM, so pages work without their stylesheets too
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "stylesheet"}
+BLOCKED_HOSTS = (
+    "pendo.io",
+    # Third-party analytics and tag managers
+    "googletagmanager.com",
+    "google-analytics.com",
+    "doubleclick.net",
+    "segment.io",
+    "cdn.segment.com",
+    "hotjar.com",
+    "fullstory.com",
 )
-logger = logging.getLogger(__name__)
 
-# Batch size for processing URLs
-BATCH_SIZE = 10
+# reCAPTCHA scripts are only blocked once logged in (the login form may need them)
+RECAPTCHA_URL_PATTERN = "**/recaptcha/**"
+
+# Marker shown next to each problem URL in the summary (default: '?')
+ISSUE_ICONS = {'ERROR': 'X', 'NOT_FOUND': '?', 'UNKNOWN': '?'}
+
+# Lean Chromium launch: skip GPU, extensions and background services we never use
+CHROMIUM_ARGS = [
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-dev-shm-usage",
+    "--no-sandbox",
+    "--disable-background-networking",
+    "--disable-component-update",
+    # Background tabs in the page pool must run at full speed, not throttled
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-background-timer-throttling",
+    "--disable-features=Translate,BackForwardCache,TranslateUI,InfiniteSessionRestore",
+]
+
+# Service workers are blocked so they cannot keep pages from going network-idle
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1280, "height": 800},
+    "bypass_csp": True,
+    "service_workers": "block",
+}
+
+# Runs before page scripts: stubs the Pendo global so no guide is ever scheduled, and
+# hides/removes any Pendo overlay from the moment the document exists (once per context)
+PENDO_BLOCK_JS = """
+window.pendo = {initialize() {}, identify() {}, track() {}, showGuideById() {}};
+const pendoSelector = '#pendo-base, [class*="pendo-backdrop"], ._pendo-step-container';
+const style = document.createElement('style');
+style.textContent = pendoSelector + ' { display: none !important; }';
+const start = () => {
+    (document.head || document.documentElement).appendChild(style);
+    // Remove overlays as soon as they are inserted so they never cover the page
+    new MutationObserver(() => {
+        document.querySelectorAll(pendoSelector).forEach(el => el.remove());
+    }).observe(document.documentElement, {childList: true, subtree: true});
+};
+if (document.documentElement) {
+    start();
+} else {
+    document.addEventListener('readystatechange', start, {once: true});
+}
+"""
 
 
 def print_status(message, symbol="*"):
@@ -43,7 +208,13 @@ def print_status(message, symbol="*"):
 
 
 def print_progress(current, total, url_name, status=""):
-    """Print progress indicator."""
+    """Print progress indicator (at most every PROGRESS_INTERVAL seconds, but always the final update)."""
+    global last_progress_print
+    now = time.monotonic()
+    if current < total and now - last_progress_print < PROGRESS_INTERVAL:
+        return
+    last_progress_print = now
+
     percentage = int((current / total) * 100)
     bar_length = 30
     filled = int(bar_length * current / total)
@@ -52,113 +223,118 @@ def print_progress(current, total, url_name, status=""):
     print(f"\r[{bar}] {current}/{total} ({percentage}%) | {url_name}{status_text}    ", end="", flush=True)
 
 
+def is_login_url(url: str) -> bool:
+    """True if the URL's path is a login page (see LOGIN_URL_PATTERN)."""
+    return bool(LOGIN_URL_PATTERN.search(urlsplit(url).path))
+
+
+def is_blocked_host(url: str) -> bool:
+    """True if the URL's host is one of BLOCKED_HOSTS or a subdomain of one (the path and query are ignored)."""
+    hostname = (urlsplit(url).hostname or '').lower()
+    return any(hostname == host or hostname.endswith('.' + host) for host in BLOCKED_HOSTS)
+
+
+async def block_unneeded_requests(route):
+    """Abort images, fonts, media, stylesheets, Pendo and analytics requests; let everything else through."""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or is_blocked_host(request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def abort_request(route):
+    """Abort a request (route handler for resources blocked after login)."""
+    await route.abort()
+
+
+def login_key(userid) -> str:
+    """Return a short hash of a login, used to name its saved session and browser profile."""
+    return hashlib.sha1(str(userid).encode()).hexdigest()[:8]
+
+
+def session_file_for(userid) -> str:
+    """Return the saved-session file name for a login."""
+    return SESSION_FILE_TEMPLATE.format(login_key(userid))
+
+
 class StatusChecker:
-    def __init__(self, excel_path: str, headless: bool = True):
+    def __init__(self, excel_path: str, headless: bool = True, cdp_endpoint: str = None,
+                 popup_fallback: bool = False, max_pages: int = MAX_PARALLEL_PAGES,
+                 profile_dir: str = None):
         self.excel_path = excel_path
         self.headless = headless
+        self.cdp_endpoint = cdp_endpoint
+        self.popup_fallback = popup_fallback
+        self.max_pages = max(1, max_pages)
+        self.profile_dir = profile_dir
         self.results = []
+        self.results_csv = None
+        self.results_writer = None
         self.context = None
+        self.shared_context = False
         self.browser = None
+        self.page_pool = None
+        self.opened_pages = []
+        self.toggle_hint = None
         self.start_time = None
 
-    def load_excel(self) -> pd.DataFrame:
-        """Load and validate Excel file."""
+    def load_excel(self) -> list:
+        """Load and validate Excel file. Returns a list of (url, url_short, userid, password) tuples."""
         print_status(f"Loading Excel file: {self.excel_path}", ">>")
 
-        df = pd.read_excel(self.excel_path)
-        df.columns = df.columns.str.strip().str.lower()
+        # Stream the sheet row by row instead of building a DataFrame
+        wb = openpyxl.load_workbook(self.excel_path, read_only=True, data_only=True)
+        try:
+            sheet_rows = wb.active.iter_rows(values_only=True)
+            header = [str(c).strip().lower() if c is not None else '' for c in next(sheet_rows, ())]
 
-        required_columns = ['url', 'userid', 'password']
-        missing = [col for col in required_columns if col not in df.columns]
+            required_columns = ['url', 'userid', 'password']
+            missing = [col for col in required_columns if col not in header]
 
-        if missing:
-            raise ValueError(f"Missing required columns: {missing}")
+            if missing:
+                raise ValueError(f"Missing required columns: {missing}")
 
-        # Clean data: remove empty rows and whitespace
-        df = df.dropna(subset=['url'])
-        df['url'] = df['url'].astype(str).str.strip()
-        df = df[df['url'] != '']
-        df = df[~df['url'].str.lower().isin(['nan', 'none', ''])]
+            url_col, userid_col, password_col = (header.index(col) for col in required_columns)
 
-        # Reset index after filtering
-        df = df.reset_index(drop=True)
+            # Clean data: remove empty rows and whitespace
+            rows = []
+            for row in sheet_rows:
+                row = row + (None,) * (len(header) - len(row))
+                url = str(row[url_col]).strip() if row[url_col] is not None else ''
+                if url.lower() in ('', 'nan', 'none'):
+                    continue
+                rows.append((url, url.rsplit('/', 1)[-1], row[userid_col], row[password_col]))
+        finally:
+            wb.close()
 
-        print(f"    Found {len(df)} URLs to check")
-        logger.info(f"Loaded {len(df)} rows from Excel")
-        return df
+        print(f"    Found {len(rows)} URLs to check")
+        logger.info(f"Loaded {len(rows)} rows from Excel")
+        return rows
 
-    def is_login_page(self, page) -> bool:
+    async def is_login_page(self, page) -> bool:
         """Detect if the current page is a login page."""
-        login_indicators = [
-            'input[type="password"]',
-            'form[action*="login"]',
-            'form[action*="signin"]',
-        ]
-
-        for selector in login_indicators:
-            try:
-                if page.locator(selector).count() > 0:
-                    return True
-            except Exception:
-                continue
-
-        return False
+        try:
+            # Plain CSS, so let the browser answer directly instead of counting matches
+            return await page.evaluate("(selector) => document.querySelector(selector) !== null",
+                                       LOGIN_INDICATORS_SELECTOR)
+        except Exception:
+            return False
 
-    def login(self, page, userid: str, password: str) -> bool:
+    async def login(self, page, userid: str, password: str) -> bool:
         """Login to the website."""
         try:
             print(f"    Logging in as: {userid}")
             logger.info(f"Attempting login for user: {userid}")
 
-            username_selectors = [
-                'input[placeholder*="email"]',
-                'input[placeholder*="Email"]',
-                'input[type="email"]',
-                'input[name="email"]',
-            ]
-
-            password_selectors = [
-                'input[placeholder*="password"]',
-                'input[type="password"]',
-            ]
-
-            submit_selectors = [
-                'button:has-text("Login")',
-                'button:has-text("Log in")',
-                'button[type="submit"]',
-            ]
-
-            # Fill username
-            for selector in username_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        page.fill(selector, userid)
-                        break
-                except Exception:
-                    continue
+            # Each selector is a union, so every step is a single locator action (which waits for the field)
+            await page.locator(USERNAME_SELECTOR).first.fill(userid, timeout=10000)
+            await page.locator(PASSWORD_SELECTOR).first.fill(password, timeout=10000)
+            await page.locator(SUBMIT_SELECTOR).first.click(timeout=10000)
 
-            # Fill password
-            for selector in password_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        page.fill(selector, password)
-                        break
-                except Exception:
-                    continue
-
-            # Click submit
-            for selector in submit_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        page.click(selector)
-                        break
-                except Exception:
-                    continue
-
-            # Wait for login to complete
-            page.wait_for_timeout(3000)
-            page.wait_for_load_state("networkidle", timeout=30000)
-            page.wait_for_timeout(2000)
+            # Wait for login to complete (login form goes away)
+            await page.wait_for_selector('input[type="password"]', state="detached", timeout=30000)
+            await page.wait_for_load_state("domcontentloaded", timeout=30000)
 
             print("    Login successful!")
             logger.info("Login successful")
@@ -169,108 +345,62 @@ class StatusChecker:
             logger.error(f"Login failed: {str(e)}")
             return False
 
-    def dismiss_popups(self, page):
-        """Dismiss Pendo popups and other overlays that may block interactions."""
+    async def dismiss_popups(self, page):
+        """Click a Pendo close button if one is showing (fallback; Pendo is normally blocked and hidden)."""
         try:
-            # Pendo popup dismiss selectors
-            pendo_dismiss_selectors = [
-                '#pendo-close-guide-.*',
-                '[data-pendo-close-guide]',
-                'button._pendo-close-guide',
-                '._pendo-close-guide',
-                '[class*="pendo"] button[aria-label*="close"]',
-                '[class*="pendo"] button[aria-label*="Close"]',
-                '[class*="pendo"] [class*="close"]',
-                '#pendo-base button',
-                '._pendo-step-container button',
-            ]
-
-            for selector in pendo_dismiss_selectors:
-                try:
-                    close_btn = page.locator(selector).first
-                    if close_btn.count() > 0 and close_btn.is_visible():
-                        close_btn.click(force=True)
-                        logger.info(f"Dismissed Pendo popup using: {selector}")
-                        page.wait_for_timeout(500)
-                        return True
-                except Exception:
-                    continue
-
-            # Try pressing Escape key to dismiss any modal
-            try:
-                page.keyboard.press("Escape")
-                page.wait_for_timeout(300)
-            except Exception:
-                pass
-
-            # Try removing Pendo elements via JavaScript
-            try:
-                page.evaluate("""
-                    const pendoElements = document.querySelectorAll('#pendo-base, [class*="pendo-backdrop"], ._pendo-step-container');
-                    pendoElements.forEach(el => el.remove());
-                """)
-            except Exception:
-                pass
-
-            return False
-        except Exception as e:
-            logger.debug(f"Error dismissing popups: {str(e)}")
+            await page.locator(PENDO_DISMISS_SELECTOR).first.click(force=True, timeout=500)
+            logger.info("Dismissed Pendo popup")
+            return True
+        except Exception:
             return False
 
-    def check_toggle_status(self, page, url: str) -> dict:
+    async def read_toggle_state(self, page, timeout: int = 15000) -> dict:
+        """Wait until the toggle checkbox exists and return {'checked': bool, 'hint': str}."""
+        handle = await page.wait_for_function(
+            TOGGLE_STATE_JS, arg={'label': TOGGLE_LABEL, 'hint': self.toggle_hint}, polling=250, timeout=timeout)
+        state = await handle.json_value()
+        # All URLs are the same app, so remember where the toggle was found
+        self.toggle_hint = state['hint']
+        return state
+
+    async def check_toggle_status(self, page, url: str, url_short: str) -> dict:
         """Check the current toggle status without modifying it."""
         result = {
             'url': url,
-            'url_short': url.split('/')[-1],
+            'url_short': url_short,
             'toggle_status': 'UNKNOWN',
             'message': '',
-            'checked_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'checked_at': time.strftime('%Y-%m-%d %H:%M:%S')
         }
 
         try:
-            # Wait for page to fully load
-            try:
-                page.wait_for_load_state("networkidle", timeout=30000)
-            except Exception:
-                logger.info("Page still loading, continuing...")
-            page.wait_for_timeout(3000)
-
-            # Dismiss any Pendo popups that may be blocking
-            self.dismiss_popups(page)
-
-            # Check toggle state
-            toggle_selector = 'text="In-app event postbacks" >> .. >> input[type="checkbox"]'
+            # Pendo is blocked up front; only dismiss popups if asked to
+            if self.popup_fallback:
+                await self.dismiss_popups(page)
 
-            # Wait for toggle element to appear with retry logic
-            toggle_found = False
-            for attempt in range(2):
+            # The toggle appearing is the readiness signal; networkidle may never fire on this app
+            state = None
+            try:
+                state = await self.read_toggle_state(page)
+            except PlaywrightTimeoutError:
+                logger.info("Toggle not found")
+            except PlaywrightError as e:
+                logger.info(f"Page error while waiting for toggle, refreshing page and retrying: {str(e)}")
+                await page.reload(wait_until="domcontentloaded", timeout=30000)
+                if self.popup_fallback:
+                    await self.dismiss_popups(page)
                 try:
-                    page.wait_for_selector(toggle_selector, timeout=20000)
-                    toggle_found = True
-                    break
-                except Exception:
-                    if attempt == 0:
-                        logger.info("Toggle not found, refreshing page and retrying...")
-                        page.reload(wait_until="networkidle", timeout=30000)
-                        page.wait_for_timeout(3000)
-                        self.dismiss_popups(page)
-                    else:
-                        logger.info("Toggle not found after retry")
+                    state = await self.read_toggle_state(page)
+                except PlaywrightTimeoutError:
+                    logger.info("Toggle not found after retry")
 
-            if not toggle_found:
+            if not state:
                 result['toggle_status'] = 'NOT_FOUND'
-                result['message'] = 'Toggle element not found (timeout waiting for element after retry)'
+                result['message'] = 'Toggle element not found (timeout waiting for element)'
                 return result
 
-            toggle = page.locator(toggle_selector).first
-
-            if toggle.count() > 0:
-                is_checked = toggle.is_checked()
-                result['toggle_status'] = 'ON' if is_checked else 'OFF'
-                result['message'] = 'Status checked successfully'
-            else:
-                result['toggle_status'] = 'NOT_FOUND'
-                result['message'] = 'Toggle element not found on page'
+            result['toggle_status'] = 'ON' if state['checked'] else 'OFF'
+            result['message'] = 'Status checked successfully'
 
         except Exception as e:
             result['toggle_status'] = 'ERROR'
@@ -279,124 +409,93 @@ class StatusChecker:
 
         return result
 
-    def process_batch(self, df_batch, batch_num, total_batches, start_idx, total_urls):
-        """Process a batch of URLs."""
-        print(f"\n    Processing batch {batch_num}/{total_batches} ({len(df_batch)} URLs)...")
-
-        pages = []
-        urls = []
-        processed_count = 0
+    def record_result(self, result: dict):
+        """Keep a result for the report and append it to the CSV right away."""
+        self.results.append(result)
+        if self.results_writer:
+            self.results_writer.writerow(result)
 
-        # Open all URLs in this batch
-        for batch_idx, (idx, row) in enumerate(df_batch.iterrows()):
-            url_short = row['url'].split('/')[-1]
-            current_num = start_idx + batch_idx + 1
-            print_progress(current_num, total_urls, url_short, "Opening...")
+    async def check_url(self, url: str, url_short: str, total_urls: int):
+        """Open a URL on a tab borrowed from the page pool and check its toggle status."""
+        page = await self.page_pool.get()
 
+        try:
+            print_progress(len(self.results), total_urls, url_short, "Opening...")
             try:
-                page = self.context.new_page()
-                page.goto(row['url'], wait_until="domcontentloaded", timeout=120000)
-                pages.append(page)
-                urls.append(row['url'])
+                # Return once navigation commits; waiting for the toggle is the real readiness check
+                await page.goto(url, wait_until="commit", timeout=60000)
                 logger.info(f"Opened: {url_short}")
             except Exception as e:
                 # If page fails to open, record error and continue
                 logger.error(f"Failed to open {url_short}: {str(e)}")
-                self.results.append({
-                    'url': row['url'],
+                self.record_result({
+                    'url': url,
                     'url_short': url_short,
                     'toggle_status': 'ERROR',
                     'message': f'Failed to open page: {str(e)[:100]}',
-                    'checked_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'checked_at': time.strftime('%Y-%m-%d %H:%M:%S')
                 })
-                processed_count += 1
-                continue
-
-        # Wait for all pages to load
-        if pages:
-            print(f"\n    Waiting for {len(pages)} pages to load...")
-            for page in pages:
-                try:
-                    page.wait_for_load_state("networkidle", timeout=30000)
-                except Exception:
-                    pass
-
-        # Check status of each page
-        for idx, (page, url) in enumerate(zip(pages, urls)):
-            url_short = url.split('/')[-1]
-            current_num = start_idx + processed_count + idx + 1
-            print_progress(current_num, total_urls, url_short, "Checking...")
+                print_progress(len(self.results), total_urls, url_short, "ERROR")
+                return
 
             try:
-                page.bring_to_front()
-                page.wait_for_timeout(500)
+                result = await self.check_toggle_status(page, url, url_short)
+                self.record_result(result)
 
-                result = self.check_toggle_status(page, url)
-                self.results.append(result)
-
-                status_symbol = result['toggle_status']
-                print_progress(current_num, total_urls, url_short, status_symbol)
+                print_progress(len(self.results), total_urls, url_short, result['toggle_status'])
                 logger.info(f"Status for {url_short}: {result['toggle_status']}")
 
             except Exception as e:
                 logger.error(f"Error checking {url_short}: {str(e)}")
-                self.results.append({
+                self.record_result({
                     'url': url,
                     'url_short': url_short,
                     'toggle_status': 'ERROR',
                     'message': f'Error: {str(e)[:100]}',
-                    'checked_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'checked_at': time.strftime('%Y-%m-%d %H:%M:%S')
                 })
-            finally:
-                try:
-                    page.close()
-                except Exception:
-                    pass
-
-        print()  # New line after progress bar
+        finally:
+            # Return the tab to the pool (replace it if it crashed or was closed)
+            if page.is_closed():
+                page = await self.new_page()
+            self.page_pool.put_nowait(page)
 
     def run(self):
-        """Main execution method with batch processing."""
+        """Main execution method."""
+        # uvloop's faster event loop when it is installed (not available on Windows);
+        # uvloop.run only exists from uvloop 0.18, older versions fall back to asyncio
+        (getattr(uvloop, "run", None) or asyncio.run)(self.run_async())
+
+    async def run_async(self):
+        """Main execution method."""
         self.start_time = datetime.now()
-        df = self.load_excel()
+        rows = self.load_excel()
 
-        if len(df) == 0:
+        if not rows:
             print_status("No URLs found in Excel file!", "!!")
             return
 
-        total_urls = len(df)
-        total_batches = (total_urls + BATCH_SIZE - 1) // BATCH_SIZE
+        total_urls = len(rows)
+
+        if self.profile_dir:
+            # One profile per login, so a profile never starts out logged in as someone else
+            self.profile_dir = str(Path(self.profile_dir) / login_key(rows[0][2]))
 
         print_status(f"STATUS CHECK - Checking {total_urls} URLs", "=")
-        print(f"    Processing in {total_batches} batches of up to {BATCH_SIZE} URLs each")
+        print(f"    Checking up to {self.max_pages} URLs at a time")
+
+        # Line-buffered, so every finished URL reaches the disk immediately
+        self.results_csv = open(RESULTS_CSV, 'w', newline='', encoding='utf-8', buffering=1)
+        self.results_writer = csv.DictWriter(self.results_csv, fieldnames=RESULT_FIELDS)
+        self.results_writer.writeheader()
 
         try:
-            with sync_playwright() as p:
+            async with async_playwright() as p:
                 # Launch browser
                 print_status("Starting browser...", ">>")
-                browser_name = None
+                browser_name = await self.launch_browser(p)
 
-                try:
-                    self.browser = p.chromium.launch(headless=self.headless)
-                    browser_name = "Chromium"
-                except Exception:
-                    pass
-
-                if not self.browser:
-                    try:
-                        self.browser = p.chromium.launch(headless=self.headless, channel="chrome")
-                        browser_name = "Chrome"
-                    except Exception:
-                        pass
-
-                if not self.browser:
-                    try:
-                        self.browser = p.firefox.launch(headless=self.headless)
-                        browser_name = "Firefox"
-                    except Exception:
-                        pass
-
-                if not self.browser:
+                if not (self.browser or self.context):
                     print_status("ERROR: No browser available!", "!!")
                     logger.error("No browser available")
                     return
@@ -404,61 +503,170 @@ class StatusChecker:
                 print(f"    Using: {browser_name}")
                 logger.info(f"Using browser: {browser_name}")
 
+                first_url, _, first_userid, first_password = rows[0]
+                session_file = session_file_for(first_userid)
+
                 # Create single context (session) for all operations
-                self.context = self.browser.new_context()
+                if self.profile_dir:
+                    print(f"    Using browser profile: {self.profile_dir}")
+                elif self.cdp_endpoint and self.browser.contexts:
+                    # The user's own browser session; request blocking goes on our tabs only (new_page)
+                    self.context = self.browser.contexts[0]
+                    self.shared_context = True
+                elif self.has_fresh_session(session_file):
+                    print("    Restoring saved session")
+                    self.context = await self.browser.new_context(storage_state=session_file, **CONTEXT_OPTIONS)
+                else:
+                    self.context = await self.browser.new_context(**CONTEXT_OPTIONS)
+                if not self.shared_context:
+                    await self.context.route("**/*", block_unneeded_requests)
+                    await self.context.add_init_script(PENDO_BLOCK_JS)
 
                 # Step 1: Login using first URL
                 print_status("Step 1: Logging in...", ">>")
-                first_row = df.iloc[0]
 
-                first_page = self.context.new_page()
+                if self.profile_dir and self.context.pages:
+                    first_page = self.context.pages[0]  # the tab a persistent context opens with
+                else:
+                    first_page = await self.new_page()
+                first_page_kind = None
                 try:
-                    first_page.goto(first_row['url'], wait_until="domcontentloaded", timeout=120000)
-                    first_page.wait_for_load_state("networkidle", timeout=30000)
+                    await first_page.goto(first_url, wait_until="domcontentloaded", timeout=120000)
+                    if is_login_url(first_page.url):
+                        first_page_kind = 'login'  # the server already redirected to the login page
+                    else:
+                        # One page-side wait tells whether the session is valid (toggle) or a login is needed
+                        handle = await first_page.wait_for_function(
+                            FIRST_PAGE_KIND_JS, arg={'label': TOGGLE_LABEL, 'loginSelector': LOGIN_INDICATORS_SELECTOR},
+                            polling=250, timeout=30000)
+                        first_page_kind = await handle.json_value()
                 except Exception as e:
                     logger.info(f"Page load timeout, continuing: {str(e)}")
 
-                if self.is_login_page(first_page):
-                    if not self.login(first_page, first_row['userid'], first_row['password']):
+                # The login heuristic only runs if the page never settled on either
+                if first_page_kind == 'login' or (first_page_kind is None and await self.is_login_page(first_page)):
+                    # Any saved session for this login is stale now; drop it so a failed login can't reuse it
+                    Path(session_file).unlink(missing_ok=True)
+                    if not await self.login(first_page, str(first_userid), str(first_password)):
                         print_status("Login FAILED! Please check credentials.", "!!")
-                        self.context.close()
-                        self.browser.close()
+                        await self.close_browser()
                         return
+                    # Only save sessions of our own browser: a CDP context holds the user's
+                    # cookies and storage for every site
+                    if not self.cdp_endpoint:
+                        await self.context.storage_state(path=session_file)
+                        # The session holds login cookies, so keep it private to this user
+                        os.chmod(session_file, 0o600)
+                        logger.info(f"Session saved to: {session_file}")
                 else:
                     print("    Already logged in (session active)")
 
-                first_page.close()
+                # Routes added later take precedence over the catch-all route
+                if not self.shared_context:
+                    await self.context.route(RECAPTCHA_URL_PATTERN, abort_request)
                 print_status("Login complete - Session established", "OK")
 
-                # Step 2: Process URLs in batches
-                print_status(f"Step 2: Checking {total_urls} URLs in batches...", ">>")
+                # Reuse a fixed pool of tabs (starting with the login tab) for all URLs;
+                # the extra tabs are opened concurrently
+                self.page_pool = asyncio.Queue()
+                self.page_pool.put_nowait(first_page)
+                extra_pages = await asyncio.gather(*[self.new_page()
+                                                     for _ in range(min(self.max_pages, total_urls) - 1)])
+                for page in extra_pages:
+                    self.page_pool.put_nowait(page)
 
-                for batch_num in range(total_batches):
-                    start_idx = batch_num * BATCH_SIZE
-                    end_idx = min(start_idx + BATCH_SIZE, total_urls)
-                    df_batch = df.iloc[start_idx:end_idx]
+                # Step 2: Check all URLs; the page pool limits how many run at once
+                print_status(f"Step 2: Checking {total_urls} URLs...", ">>")
 
-                    self.process_batch(df_batch, batch_num + 1, total_batches, start_idx, total_urls)
+                await asyncio.gather(*[self.check_url(url, url_short, total_urls)
+                                       for url, url_short, _, _ in rows])
+                print()  # New line after progress bar
 
-                self.context.close()
-                self.browser.close()
+                await self.close_browser()
 
         except Exception as e:
             print_status(f"UNEXPECTED ERROR: {str(e)}", "!!")
             logger.error(f"Unexpected error: {str(e)}")
             # Try to close browser on error
             try:
-                if self.context:
-                    self.context.close()
-                if self.browser:
-                    self.browser.close()
+                await self.close_browser()
             except Exception:
                 pass
         finally:
             # Always save results, even if there was an error
+            self.results_csv.close()
+            self.results_writer = None
             self.save_results()
             self.print_summary()
 
+    def has_fresh_session(self, session_file: str) -> bool:
+        """Check whether a saved login session exists and is recent enough to reuse."""
+        session = Path(session_file)
+        return session.exists() and time.time() - session.stat().st_mtime < SESSION_MAX_AGE_HOURS * 3600
+
+    async def launch_browser(self, p):
+        """Connect to or launch a browser (Chromium, then Chrome, then Firefox), or open the
+        persistent profile with the first engine that works. Returns its name."""
+        if self.cdp_endpoint:
+            # Reuse an already running browser and its session
+            try:
+                self.browser = await p.chromium.connect_over_cdp(self.cdp_endpoint)
+                return f"Existing browser at {self.cdp_endpoint}"
+            except Exception as e:
+                logger.error(f"Could not connect to {self.cdp_endpoint}: {str(e)}")
+                return None
+
+        # Only try engines whose binaries are installed, so a missing one costs nothing.
+        # Chrome is a system install whose location Playwright resolves itself.
+        launchers = []
+        if os.path.exists(p.chromium.executable_path):
+            launchers.append(("Chromium", p.chromium, {"args": CHROMIUM_ARGS}))
+        launchers.append(("Chrome", p.chromium, {"channel": "chrome", "args": CHROMIUM_ARGS}))
+        if os.path.exists(p.firefox.executable_path):
+            launchers.append(("Firefox", p.firefox, {}))
+
+        if self.profile_dir:
+            # A profile belongs to one engine: never retry another one on the same folder
+            # (e.g. when the profile is locked by a running instance)
+            launchers = launchers[:1]
+
+        for name, browser_type, options in launchers:
+            try:
+                if self.profile_dir:
+                    # The persistent context owns its browser; self.browser stays None
+                    self.context = await browser_type.launch_persistent_context(
+                        self.profile_dir, headless=self.headless, **options, **CONTEXT_OPTIONS)
+                else:
+                    self.browser = await browser_type.launch(headless=self.headless, **options)
+                return name
+            except Exception as e:
+                logger.info(f"Could not launch {name}: {str(e)}")
+
+        return None
+
+    async def new_page(self):
+        """Open a tab. On a shared CDP context the blocking is set up on the tab itself, so the
+        user's other tabs are left alone."""
+        page = await self.context.new_page()
+        self.opened_pages.append(page)
+        if self.shared_context:
+            await page.route("**/*", block_unneeded_requests)
+            await page.add_init_script(PENDO_BLOCK_JS)
+        return page
+
+    async def close_browser(self):
+        """Close the context and browser (only disconnect from a shared CDP browser)."""
+        if self.context and not self.cdp_endpoint:
+            await self.context.close()
+        else:
+            # Leave the shared browser as we found it: close every tab we opened, including the
+            # login tab when the run stopped before the page pool existed
+            for page in self.opened_pages:
+                if not page.is_closed():
+                    await page.close()
+        if self.browser:
+            await self.browser.close()
+
     def save_results(self):
         """Save results to Excel (overwrites previous file)."""
         if not self.results:
@@ -466,8 +674,17 @@ class StatusChecker:
             return
 
         output_file = "status_report.xlsx"
-        results_df = pd.DataFrame(self.results)
-        results_df.to_excel(output_file, index=False)
+
+        # Stream rows straight into a write-only workbook
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Status")
+        ws.append(RESULT_FIELDS)
+        for r in self.results:
+            ws.append([r.get(col) for col in RESULT_FIELDS])
+        wb.save(output_file)
+
+        # The Excel report now holds everything the partial CSV did
+        Path(RESULTS_CSV).unlink(missing_ok=True)
 
         print_status(f"Results saved to: {output_file}", ">>")
         logger.info(f"Results saved to: {output_file}")
@@ -492,9 +709,10 @@ class StatusChecker:
         if not self.results:
             return
 
-        on_count = sum(1 for r in self.results if r['toggle_status'] == 'ON')
-        off_count = sum(1 for r in self.results if r['toggle_status'] == 'OFF')
-        error_count = sum(1 for r in self.results if r['toggle_status'] in ['ERROR', 'NOT_FOUND', 'UNKNOWN'])
+        counts = Counter(r['toggle_status'] for r in self.results)
+        on_count = counts['ON']
+        off_count = counts['OFF']
+        error_count = len(self.results) - on_count - off_count
 
         # Calculate duration
         end_time = datetime.now()
@@ -524,8 +742,8 @@ class StatusChecker:
             print("\n  ISSUES FOUND:")
             print("-" * 60)
             for r in self.results:
-                if r['toggle_status'] in ['ERROR', 'NOT_FOUND', 'UNKNOWN']:
-                    print(f"  [?] {r['url_short']}")
+                if r['toggle_status'] not in ('ON', 'OFF'):
+                    print(f"  [{ISSUE_ICONS.get(r['toggle_status'], '?')}] {r['url_short']}")
                     print(f"      {r['message'][:50]}...")
             print("-" * 60)
 
@@ -547,6 +765,18 @@ def main():
                         help='Run browser in headless mode')
     parser.add_argument('--no-headless', action='store_false', dest='headless',
                         help='Run browser with visible window')
+    # Both choose where the browser comes from, so only one of them can be used
+    browser_source = parser.add_mutually_exclusive_group()
+    browser_source.add_argument('--cdp-endpoint', default=None,
+                        help='Connect to a running Chrome started with --remote-debugging-port '
+                             '(e.g. http://localhost:9222) instead of launching a new one')
+    parser.add_argument('--dismiss-popups', action='store_true',
+                        help='Also try to close Pendo popups on every page (only needed if they still appear)')
+    browser_source.add_argument('--profile-dir', nargs='?', const=str(DEFAULT_PROFILE_DIR), default=None,
+                        help='Keep a browser profile per login between runs (cookies, cache) in this folder '
+                             f'(default when given without a path: {DEFAULT_PROFILE_DIR})')
+    parser.add_argument('--max-pages', type=int, default=MAX_PARALLEL_PAGES,
+                        help=f'Number of URLs checked at the same time (default: {MAX_PARALLEL_PAGES})')
 
     args = parser.parse_args()
 
@@ -555,11 +785,15 @@ def main():
         return
 
     try:
-        checker = StatusChecker(args.excel_file, args.headless)
+        checker = StatusChecker(args.excel_file, args.headless, args.cdp_endpoint, args.dismiss_popups,
+                                args.max_pages, args.profile_dir)
         checker.run()
     except Exception as e:
         print_status(f"FATAL ERROR: {str(e)}", "!!")
         logger.error(f"Fatal error: {str(e)}")
+    finally:
+        # Write out any queued log records
+        log_listener.stop()
 
     # Beep to notify completion
     print("\a")
@@ -1,7 +1,8 @@
 """
 Automated Toggle Script
 Reads URLs from Excel and sets toggle to desired state (ON/OFF).
-Uses single login session with batch processing for reliability.
+Uses one login session per userid (logins run in parallel) and processes URLs concurrently
+on a fixed pool of tabs (async Playwright): a new URL starts as soon as any tab is free.
 
 Excel format:
 URL | userid | password
@@ -11,32 +12,237 @@ https://example.com/settings | user2 | pass2
 Usage:
 python toggle_automation.py "ToggleExcel_A.xlsx" --state ON --no-headless
 python toggle_automation.py "ToggleExcel_B.xlsx" --state OFF --no-headless
+python toggle_automation.py "ToggleExcel_A.xlsx" --state ON --max-pages 5
+python toggle_automation.py "ToggleExcel_A.xlsx" "ToggleExcel_B.xlsx" --state ON
+python toggle_automation.py "ToggleExcel_A.xlsx" --state ON --fresh-login
+python toggle_automation.py "ToggleExcel_A.xlsx" --state ON --dismiss-popups
+python toggle_automation.py "ToggleExcel_A.xlsx" --state ON --profile-dir
 """
 
-import pandas as pd
-from playwright.sync_api import sync_playwright
+import openpyxl
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import argparse
+import asyncio
+import csv
+import hashlib
 import logging
+import logging.handlers
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
 import sys
 import os
 import platform
+import queue
+import re
+import shlex
 import subprocess
+import time
+from urllib.parse import urlsplit
+
+# Optional: faster event loop for the Playwright driver connection (pip install uvloop)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Setup logging: the hot path only enqueues records; a background thread writes them
+# to the log file and the console
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+log_file_handler = logging.FileHandler(f'toggle_automation_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
+log_console_handler = logging.StreamHandler()
+for log_handler in (log_file_handler, log_console_handler):
+    log_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(log_queue, log_file_handler, log_console_handler)
+log_listener.start()
+log_queue_handler = logging.handlers.QueueHandler(log_queue)
+# Pass the bare message on; LOG_FORMAT is applied once, by the listener's handlers
+log_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[log_queue_handler])
+logger = logging.getLogger(__name__)
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f'toggle_automation_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'),
-        logging.StreamHandler()
-    ]
+# Maximum number of tabs driven concurrently (size of the reusable page pool, shared by all logins)
+MAX_PARALLEL_PAGES = 10
+
+# Maximum number of logins submitted at the same time when the Excel file has several userids
+MAX_PARALLEL_LOGINS = 3
+
+# Minimum seconds between progress bar redraws (concurrent pages would otherwise redraw it constantly)
+PROGRESS_INTERVAL = 0.1
+last_progress_print = 0.0
+
+# Saved login session (cookies/local storage), one file per login, reused by runs within
+# SESSION_MAX_AGE_HOURS. The name holds a short hash of the userid, not the userid itself
+SESSION_FILE_TEMPLATE = ".ft_session_{}.json"
+SESSION_MAX_AGE_HOURS = 12
+
+# Default folder for --profile-dir; keeps cookies, HTTP cache and compiled JS between runs.
+# Each login gets its own profile in a subfolder named by login_key()
+DEFAULT_PROFILE_DIR = Path.home() / ".fasttoggle_profile"
+
+# Results are appended here as each URL finishes, so a crashed run still leaves its
+# results on disk; the file is removed once the Excel report has been written
+RESULTS_CSV = "toggle_results.csv"
+RESULT_FIELDS = ['url', 'userid', 'status', 'desired_state', 'toggle_state_before', 'toggle_state_after',
+                 'message', 'updated_at']
+
+# Excel columns used by the script (matched case-insensitively, surrounding spaces ignored)
+REQUIRED_COLUMNS = ['url', 'userid', 'password']
+
+# A redirect to one of these paths means the session is not logged in (no DOM check needed).
+# Matched against the URL path only, so e.g. ?next=/auth/... on a logged-in page does not count
+LOGIN_URL_PATTERN = re.compile(r'/(login|signin|sign-in|auth|sso)(/|$)', re.IGNORECASE)
+
+# Login page selectors. Each is a union, resolved in a single browser round-trip
+LOGIN_INDICATORS_SELECTOR = ', '.join([
+    'input[type="password"]',
+    'form[action*="login"]',
+    'form[action*="signin"]',
+    'form[action*="auth"]',
+    '#login-form',
+    '.login-form',
+])
+USERNAME_SELECTOR = ':is(input[placeholder*="email" i], input[type="email"], input[name="email"], input[name="username"])'
+PASSWORD_SELECTOR = ':is(input[placeholder*="password" i], input[type="password"])'
+SUBMIT_SELECTOR = ':is(button:has-text("Login"), button:has-text("Log in"), button:has-text("Sign in"), button[type="submit"])'
+
+# Pendo popup close buttons, matched in a single query
+PENDO_DISMISS_SELECTOR = ', '.join([
+    '[id^="pendo-close-guide-"]',
+    '[data-pendo-close-guide]',
+    'button._pendo-close-guide',
+    '._pendo-close-guide',
+    '[class*="pendo"] button[aria-label*="close" i]',
+    '[class*="pendo"] [class*="close"]',
+    '#pendo-base button',
+    '._pendo-step-container button',
+])
+
+# Requests not needed to set the toggle are aborted to speed up page loads.
+# The toggle is found and clicked through the DOM, so pages work without their stylesheets too
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "stylesheet"}
+BLOCKED_HOSTS = (
+    "pendo.io",
+    # Third-party analytics and tag managers
+    "googletagmanager.com",
+    "google-analytics.com",
+    "doubleclick.net",
+    "segment.io",
+    "cdn.segment.com",
+    "hotjar.com",
+    "fullstory.com",
 )
-logger = logging.getLogger(__name__)
 
-# Batch size for processing URLs
-BATCH_SIZE = 10
+# reCAPTCHA scripts are only blocked once logged in (the login form may need them)
+RECAPTCHA_URL_PATTERN = "**/recaptcha/**"
+
+# Lean Chromium launch: skip GPU, extensions and background services we never use
+CHROMIUM_ARGS = [
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-dev-shm-usage",
+    "--no-sandbox",
+    "--disable-background-networking",
+    "--disable-component-update",
+    # Background tabs in the page pool must run at full speed, not throttled
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-background-timer-throttling",
+    "--disable-sync",
+    "--disable-features=Translate,BackForwardCache,TranslateUI,InfiniteSessionRestore",
+]
+
+# Runs before page scripts: stubs the Pendo global so no guide is ever scheduled, and
+# hides/removes any Pendo overlay from the moment the document exists (once per context)
+PENDO_BLOCK_JS = """
+window.pendo = {initialize() {}, identify() {}, track() {}, showGuideById() {}};
+const pendoSelector = '#pendo-base, [class*="pendo-backdrop"], ._pendo-step-container';
+const style = document.createElement('style');
+style.textContent = pendoSelector + ' { display: none !important; }';
+const start = () => {
+    (document.head || document.documentElement).appendChild(style);
+    // Remove overlays as soon as they are inserted so they never cover the page
+    new MutationObserver(() => {
+        document.querySelectorAll(pendoSelector).forEach(el => el.remove());
+    }).observe(document.documentElement, {childList: true, subtree: true});
+};
+if (document.documentElement) {
+    start();
+} else {
+    document.addEventListener('readystatechange', start, {once: true});
+}
+"""
+
+# Label next to the toggle checkbox
+TOGGLE_LABEL = "In-app event postbacks"
+
+# Finds the checkbox next to the label (null until it exists). Also returns a CSS selector
+# for the label's container ("hint"); on later pages the hint is tried first, which is much
+# cheaper than walking every text node.
+TOGGLE_FIND_JS = """({label, hint}) => {
+    if (!document.body) return null;
+    const find = (container) => {
+        const checkbox = container && container.querySelector('input[type="checkbox"]');
+        if (!checkbox) return null;
+        const classes = [...container.classList].map(c => '.' + CSS.escape(c)).join('');
+        return {checkbox, hint: container.tagName.toLowerCase() + classes};
+    };
+    if (hint) {
+        for (const container of document.querySelectorAll(hint)) {
+            if (![...container.children].some(el => el.textContent.trim() === label)) continue;
+            const found = find(container);
+            if (found) return found;
+        }
+    }
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        if (walker.currentNode.nodeValue.trim() !== label) continue;
+        const found = find(walker.currentNode.parentElement.parentElement);
+        if (found) return found;
+    }
+    return null;
+}"""
+
+# Returns the toggle's state as {checked, hint} (null until it exists)
+TOGGLE_STATE_JS = f"""({{label, hint}}) => {{
+    const found = ({TOGGLE_FIND_JS})({{label, hint}});
+    return found && {{checked: found.checkbox.checked, hint: found.hint}};
+}}"""
+
+# True once the toggle exists and shows the given state
+TOGGLE_MATCHES_JS = f"""({{label, hint, checked}}) => {{
+    const state = ({TOGGLE_STATE_JS})({{label, hint}});
+    return state !== null && state.checked === checked;
+}}"""
+
+# What the first page of a login shows once it has rendered: 'toggle' (the session is valid,
+# so the login check is skipped) or 'login'; false until either appears
+FIRST_PAGE_KIND_JS = f"""({{label, loginSelector}}) => {{
+    if (({TOGGLE_STATE_JS})({{label, hint: null}})) return 'toggle';
+    return document.querySelector(loginSelector) ? 'login' : false;
+}}"""
+
+# Clicks the checkbox unless it already shows the given state; returns {before, after}
+# (null if the toggle is missing), so a click costs one round-trip
+TOGGLE_CLICK_JS = f"""({{label, hint, checked}}) => {{
+    const found = ({TOGGLE_FIND_JS})({{label, hint}});
+    if (!found) return null;
+    const before = found.checkbox.checked;
+    if (before !== checked) found.checkbox.click();
+    return {{before, after: found.checkbox.checked}};
+}}"""
+
+# Save buttons; all candidates are read in one query and the preferred label wins if present
+SAVE_BUTTON_SELECTOR = 'button:has-text("Save")'
+SAVE_PREFERRED_TEXT = "Save Integration"
+
+# Request methods that store a change; saving is done once the response to one arrives.
+# Only first-party XHR/fetch calls naming the integration count, so analytics beacons,
+# telemetry and autosave calls sent at the same time are ignored. The response status
+# decides if the save worked
+SAVE_METHODS = {"POST", "PUT", "PATCH"}
+SAVE_RESOURCE_TYPES = {"xhr", "fetch"}
 
 
 def print_status(message, symbol="*"):
@@ -45,7 +251,13 @@ def print_status(message, symbol="*"):
 
 
 def print_progress(current, total, url_name, status=""):
-    """Print progress indicator."""
+    """Print progress indicator (at most every PROGRESS_INTERVAL seconds, but always the final update)."""
+    global last_progress_print
+    now = time.monotonic()
+    if current < total and now - last_progress_print < PROGRESS_INTERVAL:
+        return
+    last_progress_print = now
+
     percentage = int((current / total) * 100)
     bar_length = 30
     filled = int(bar_length * current / total)
@@ -54,123 +266,157 @@ def print_progress(current, total, url_name, status=""):
     print(f"\r[{bar}] {current}/{total} ({percentage}%) | {url_name}{status_text}    ", end="", flush=True)
 
 
+def is_login_url(url: str) -> bool:
+    """True if the URL's path is a login page (see LOGIN_URL_PATTERN)."""
+    return bool(LOGIN_URL_PATTERN.search(urlsplit(url).path))
+
+
+def is_blocked_host(url: str) -> bool:
+    """True if the URL's host is one of BLOCKED_HOSTS or a subdomain of one (the path and query are ignored)."""
+    hostname = (urlsplit(url).hostname or '').lower()
+    return any(hostname == host or hostname.endswith('.' + host) for host in BLOCKED_HOSTS)
+
+
+async def block_unneeded_requests(route):
+    """Abort images, fonts, media, stylesheets, Pendo and analytics requests; let everything else through."""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or is_blocked_host(request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def abort_request(route):
+    """Abort a request (route handler for resources blocked after login)."""
+    await route.abort()
+
+
+def site_domain(url: str) -> str:
+    """Return the last two labels of a URL's host (e.g. appsflyer.com)."""
+    return '.'.join((urlsplit(url).hostname or '').split('.')[-2:])
+
+
+def integration_id(page_url: str) -> str:
+    """Return the integration named by an integration page URL (its last path segment, e.g. collectcent_int)."""
+    return urlsplit(page_url).path.rstrip('/').rsplit('/', 1)[-1]
+
+
+def is_save_response(response, page_url: str) -> bool:
+    """Check whether a response answers the page's own API call that stores this integration."""
+    request = response.request
+    if not (request.method in SAVE_METHODS and request.resource_type in SAVE_RESOURCE_TYPES
+            and site_domain(response.url) == site_domain(page_url)):
+        return False
+    # The save call names the integration in its URL or its body
+    integration = integration_id(page_url)
+    try:
+        body = request.post_data or ''
+    except Exception:
+        body = ''  # binary body
+    return integration in request.url or integration in body
+
+
+def login_key(userid) -> str:
+    """Return a short hash of a login, used to name its saved session and browser profile."""
+    return hashlib.sha1(str(userid).encode()).hexdigest()[:8]
+
+
+def session_file_for(userid) -> str:
+    """Return the saved-session file name for a login."""
+    return SESSION_FILE_TEMPLATE.format(login_key(userid))
+
+
+async def handle_dialog(dialog):
+    """Allow leaving a page with unsaved changes (tabs are reused); dismiss any other dialog."""
+    if dialog.type == "beforeunload":
+        await dialog.accept()
+    else:
+        await dialog.dismiss()
+
+
 class ToggleAutomation:
-    def __init__(self, excel_path: str, state: str, headless: bool = True):
-        self.excel_path = excel_path
+    def __init__(self, excel_paths: list, state: str, headless: bool = True, max_pages: int = MAX_PARALLEL_PAGES,
+                 fresh_login: bool = False, launch_args: list = None, popup_fallback: bool = False,
+                 profile_dir: str = None):
+        self.excel_paths = excel_paths
         self.state = state.strip().upper()  # ON or OFF
         self.headless = headless
+        self.max_pages = max(1, max_pages)
+        self.fresh_login = fresh_login
+        self.popup_fallback = popup_fallback
+        self.profile_dir = profile_dir
+        self.launch_args = CHROMIUM_ARGS if launch_args is None else launch_args
         self.results = []
-        self.context = None
+        self.toggle_hint = None
+        self.results_csv = None
+        self.results_writer = None
+        self.contexts = []
         self.browser = None
+        self.account_slots = None
+        self.login_slots = None
         self.start_time = None
 
         if self.state not in ['ON', 'OFF']:
             raise ValueError(f"Invalid state: {state}. Must be ON or OFF.")
 
-    def load_excel(self) -> pd.DataFrame:
-        """Load and validate Excel file."""
-        print_status(f"Loading Excel file: {self.excel_path}", ">>")
+    def load_excel(self, excel_path: str) -> list:
+        """Load and validate Excel file. Returns a list of (url, url_short, userid, password) tuples."""
+        print_status(f"Loading Excel file: {excel_path}", ">>")
 
-        df = pd.read_excel(self.excel_path)
-        df.columns = df.columns.str.strip().str.lower()
+        # Stream the sheet row by row instead of building a DataFrame
+        wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+        try:
+            sheet_rows = wb.active.iter_rows(values_only=True)
+            header = [str(c).strip().lower() if c is not None else '' for c in next(sheet_rows, ())]
 
-        required_columns = ['url', 'userid', 'password']
-        missing = [col for col in required_columns if col not in df.columns]
+            missing = [col for col in REQUIRED_COLUMNS if col not in header]
 
-        if missing:
-            raise ValueError(f"Missing required columns: {missing}")
+            if missing:
+                raise ValueError(f"Missing required columns: {missing}")
 
-        # Clean data: remove empty rows and whitespace
-        df = df.dropna(subset=['url'])
-        df['url'] = df['url'].astype(str).str.strip()
-        df = df[df['url'] != '']
-        df = df[~df['url'].str.lower().isin(['nan', 'none', ''])]
+            url_col, userid_col, password_col = (header.index(col) for col in REQUIRED_COLUMNS)
 
-        # Reset index after filtering
-        df = df.reset_index(drop=True)
+            # Clean data: remove empty rows and whitespace. Credentials are kept as text
+            # (numeric passwords come back from openpyxl as numbers)
+            rows = []
+            for row in sheet_rows:
+                row = row + (None,) * (len(header) - len(row))
+                url = str(row[url_col]).strip() if row[url_col] is not None else ''
+                if url.lower() in ('', 'nan', 'none'):
+                    continue
+                userid, password = (str(row[col]) if row[col] is not None else None
+                                    for col in (userid_col, password_col))
+                rows.append((url, url.rsplit('/', 1)[-1], userid, password))
+        finally:
+            wb.close()
 
-        print(f"    Found {len(df)} URLs to process")
-        logger.info(f"Loaded {len(df)} rows from Excel")
-        return df
+        print(f"    Found {len(rows)} URLs to process")
+        logger.info(f"Loaded {len(rows)} rows from Excel")
+        return rows
 
-    def is_login_page(self, page) -> bool:
+    async def is_login_page(self, page) -> bool:
         """Detect if the current page is a login page."""
-        login_indicators = [
-            'input[type="password"]',
-            'form[action*="login"]',
-            'form[action*="signin"]',
-            'form[action*="auth"]',
-            '#login-form',
-            '.login-form',
-        ]
-
-        for selector in login_indicators:
-            try:
-                if page.locator(selector).count() > 0:
-                    return True
-            except Exception:
-                continue
-
-        return False
+        try:
+            # Plain CSS, so let the browser answer directly instead of counting matches
+            return await page.evaluate("(selector) => document.querySelector(selector) !== null",
+                                       LOGIN_INDICATORS_SELECTOR)
+        except Exception:
+            return False
 
-    def login(self, page, userid: str, password: str) -> bool:
+    async def login(self, page, userid: str, password: str) -> bool:
         """Login to the website. Optimized for AppsFlyer."""
         try:
             print(f"    Logging in as: {userid}")
             logger.info(f"Attempting login for user: {userid}")
 
-            username_selectors = [
-                'input[placeholder*="email"]',
-                'input[placeholder*="Email"]',
-                'input[type="email"]',
-                'input[name="email"]',
-                'input[name="username"]',
-            ]
-
-            password_selectors = [
-                'input[placeholder*="password"]',
-                'input[placeholder*="Password"]',
-                'input[type="password"]',
-            ]
-
-            submit_selectors = [
-                'button:has-text("Login")',
-                'button:has-text("Log in")',
-                'button:has-text("Sign in")',
-                'button[type="submit"]',
-            ]
-
-            # Fill username
-            for selector in username_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        page.fill(selector, userid)
-                        break
-                except Exception:
-                    continue
-
-            # Fill password
-            for selector in password_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        page.fill(selector, password)
-                        break
-                except Exception:
-                    continue
+            # Each selector is a union, so every step is a single locator action (which waits for the field)
+            await page.locator(USERNAME_SELECTOR).first.fill(userid, timeout=10000)
+            await page.locator(PASSWORD_SELECTOR).first.fill(password, timeout=10000)
+            await page.locator(SUBMIT_SELECTOR).first.click(timeout=10000)
 
-            # Click submit
-            for selector in submit_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        page.click(selector)
-                        break
-                except Exception:
-                    continue
-
-            # Wait for login to complete
-            page.wait_for_timeout(3000)
-            page.wait_for_load_state("networkidle", timeout=30000)
-            page.wait_for_timeout(2000)
+            # Wait for login to complete (login form goes away)
+            await page.wait_for_selector('input[type="password"]', state="detached", timeout=30000)
+            await page.wait_for_load_state("domcontentloaded", timeout=30000)
 
             print("    Login successful!")
             logger.info("Login successful")
@@ -181,55 +427,25 @@ class ToggleAutomation:
             logger.error(f"Login failed: {str(e)}")
             return False
 
-    def dismiss_popups(self, page):
-        """Dismiss Pendo popups and other overlays that may block interactions."""
+    async def dismiss_popups(self, page):
+        """Click a Pendo close button if one is showing (fallback; Pendo is normally blocked and hidden)."""
         try:
-            # Pendo popup dismiss selectors
-            pendo_dismiss_selectors = [
-                '#pendo-close-guide-.*',
-                '[data-pendo-close-guide]',
-                'button._pendo-close-guide',
-                '._pendo-close-guide',
-                '[class*="pendo"] button[aria-label*="close"]',
-                '[class*="pendo"] button[aria-label*="Close"]',
-                '[class*="pendo"] [class*="close"]',
-                '#pendo-base button',
-                '._pendo-step-container button',
-            ]
-
-            for selector in pendo_dismiss_selectors:
-                try:
-                    close_btn = page.locator(selector).first
-                    if close_btn.count() > 0 and close_btn.is_visible():
-                        close_btn.click(force=True)
-                        logger.info(f"Dismissed Pendo popup using: {selector}")
-                        page.wait_for_timeout(500)
-                        return True
-                except Exception:
-                    continue
-
-            # Try pressing Escape key to dismiss any modal
-            try:
-                page.keyboard.press("Escape")
-                page.wait_for_timeout(300)
-            except Exception:
-                pass
-
-            # Try removing Pendo elements via JavaScript
-            try:
-                page.evaluate("""
-                    const pendoElements = document.querySelectorAll('#pendo-base, [class*="pendo-backdrop"], ._pendo-step-container');
-                    pendoElements.forEach(el => el.remove());
-                """)
-            except Exception:
-                pass
-
-            return False
-        except Exception as e:
-            logger.debug(f"Error dismissing popups: {str(e)}")
+            await page.locator(PENDO_DISMISS_SELECTOR).first.click(force=True, timeout=500)
+            logger.info("Dismissed Pendo popup")
+            return True
+        except Exception:
             return False
 
-    def set_toggle_state(self, page, url: str, desired_state: str) -> dict:
+    async def read_toggle_state(self, page, timeout: int = 30000) -> dict:
+        """Wait until the toggle checkbox exists and return {'checked': bool, 'hint': str}."""
+        handle = await page.wait_for_function(
+            TOGGLE_STATE_JS, arg={'label': TOGGLE_LABEL, 'hint': self.toggle_hint}, polling=250, timeout=timeout)
+        state = await handle.json_value()
+        # All URLs are the same app, so remember where the toggle was found
+        self.toggle_hint = state['hint']
+        return state
+
+    async def set_toggle_state(self, page, url: str, desired_state: str) -> dict:
         """Set the toggle to desired state (ON/OFF) and verify the result."""
         result = {
             'url': url,
@@ -237,8 +453,7 @@ class ToggleAutomation:
             'desired_state': desired_state.upper(),
             'toggle_state_before': 'UNKNOWN',
             'toggle_state_after': 'UNKNOWN',
-            'message': '',
-            'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'message': ''
         }
 
         # Validate desired_state
@@ -250,47 +465,39 @@ class ToggleAutomation:
 
         desired_checked = (desired_state == 'on')
 
+        # Locators for the label and its checkbox, built once (used for scrolling and mouse clicks)
+        toggle_label = page.get_by_text(TOGGLE_LABEL, exact=True).first
+        toggle = toggle_label.locator("xpath=..").locator('input[type="checkbox"]').first
+
         try:
-            # Wait for page to fully load
+            # Wait for the toggle and read its state before toggling, with retry logic.
+            # The toggle appearing is the readiness signal (no networkidle wait)
+            state = None
             try:
-                page.wait_for_load_state("networkidle", timeout=30000)
+                state = await self.read_toggle_state(page, timeout=10000)
             except Exception:
-                logger.info("Page still loading, continuing...")
-            page.wait_for_timeout(3000)
-
-            # Dismiss any Pendo popups that may be blocking
-            self.dismiss_popups(page)
-
-            # Check state before toggle
-            toggle_selector = 'text="In-app event postbacks" >> .. >> input[type="checkbox"]'
-
-            # Wait for toggle element to appear with retry logic
-            toggle_found = False
-            for attempt in range(2):
+                # The section may render lazily: scroll its label into view and keep waiting
+                logger.info("Toggle not found, scrolling to it and retrying...")
                 try:
-                    page.wait_for_selector(toggle_selector, timeout=20000)
-                    toggle_found = True
-                    break
+                    await toggle_label.scroll_into_view_if_needed(timeout=2000)
                 except Exception:
-                    if attempt == 0:
-                        logger.info("Toggle not found, refreshing page and retrying...")
-                        page.reload(wait_until="networkidle", timeout=30000)
-                        page.wait_for_timeout(3000)
-                        self.dismiss_popups(page)
-                    else:
+                    pass
+                try:
+                    state = await self.read_toggle_state(page, timeout=10000)
+                except Exception:
+                    # Last resort: reload the page
+                    logger.info("Toggle not found, refreshing page and retrying...")
+                    try:
+                        await page.reload(wait_until="domcontentloaded", timeout=30000)
+                        state = await self.read_toggle_state(page, timeout=15000)
+                    except Exception:
                         logger.info("Toggle not found after retry")
 
-            if not toggle_found:
+            if not state:
                 result['message'] = 'Toggle element not found (timeout waiting for element after retry)'
                 return result
 
-            toggle = page.locator(toggle_selector).first
-
-            if toggle.count() == 0:
-                result['message'] = 'Toggle element not found'
-                return result
-
-            state_before = toggle.is_checked()
+            state_before = state['checked']
             result['toggle_state_before'] = 'ON' if state_before else 'OFF'
             logger.info(f"Toggle state before: {result['toggle_state_before']}, Desired: {desired_state.upper()}")
 
@@ -302,58 +509,92 @@ class ToggleAutomation:
                 logger.info(f"Already in desired state, no action needed")
                 return result
 
-            # Need to toggle - dismiss popups before clicking
-            self.dismiss_popups(page)
-
-            # Click toggle with force option to bypass any remaining overlays
-            try:
-                page.click(toggle_selector, timeout=5000)
-            except Exception:
-                logger.info("Normal click failed, trying force click...")
-                page.locator(toggle_selector).first.click(force=True)
-            logger.info("Toggle clicked")
+            # Need to toggle. Pendo is blocked up front; only dismiss popups if asked to
+            # (the click itself waits until the checkbox is actionable)
+            if self.popup_fallback:
+                await self.dismiss_popups(page)
 
-            # Wait for UI update
-            page.wait_for_timeout(500)
+            # Click the checkbox inside the page: find, click and re-read in one round-trip
+            clicked = await page.evaluate(
+                TOGGLE_CLICK_JS, {'label': TOGGLE_LABEL, 'hint': self.toggle_hint, 'checked': desired_checked})
 
-            # Dismiss popups before save
-            self.dismiss_popups(page)
-
-            # Click save
-            save_selectors = [
-                'button:has-text("Save Integration")',
-                'button:has-text("Save")',
-            ]
-
-            saved = False
-            for selector in save_selectors:
+            if clicked and clicked['after'] == desired_checked:
+                logger.info("Toggle clicked")
+            else:
+                # Fall back to a mouse click, with force option to bypass any remaining overlays
+                logger.info("In-page click did not change the toggle, clicking it directly...")
                 try:
-                    if page.locator(selector).count() > 0:
-                        try:
-                            page.click(selector, timeout=5000)
-                        except Exception:
-                            page.locator(selector).first.click(force=True)
-                        saved = True
-                        logger.info(f"Save clicked")
-                        break
+                    await toggle.click(timeout=5000)
                 except Exception:
-                    continue
+                    logger.info("Normal click failed, trying force click...")
+                    await toggle.click(force=True)
+                logger.info("Toggle clicked")
 
-            if not saved:
+                # Wait for the checkbox to show the new state
+                try:
+                    await page.wait_for_function(
+                        TOGGLE_MATCHES_JS, arg={'label': TOGGLE_LABEL, 'hint': self.toggle_hint, 'checked': desired_checked},
+                        polling=100, timeout=5000)
+                except PlaywrightTimeoutError:
+                    logger.info("Toggle did not change after click, saving anyway...")
+
+            if self.popup_fallback:
+                await self.dismiss_popups(page)
+
+            # Find the save button (one round-trip for every candidate's label)
+            save_buttons = page.locator(SAVE_BUTTON_SELECTOR)
+            save_texts = await save_buttons.all_inner_texts()
+            if not save_texts:
                 result['message'] = 'Save button not found'
                 return result
 
-            # Wait for save to complete
-            page.wait_for_load_state("networkidle", timeout=10000)
-            page.wait_for_timeout(3000)
+            save_index = next((i for i, text in enumerate(save_texts) if SAVE_PREFERRED_TEXT in text), 0)
+            save_button = save_buttons.nth(save_index)
 
-            # Verify state after save
-            state_after = page.locator(toggle_selector).first.is_checked()
+            # Click save and wait for the request that stores the change
+            save_response = None
+            try:
+                async with page.expect_response(lambda response: is_save_response(response, page.url),
+                                                timeout=10000) as response_info:
+                    try:
+                        await save_button.click(timeout=5000)
+                    except Exception:
+                        await save_button.click(force=True)
+                    logger.info("Save clicked")
+                save_response = await response_info.value
+            except PlaywrightTimeoutError:
+                logger.info("No save response seen, checking the stored state by reloading the page")
+
+            # Read the toggle as it is now (the click already changed it locally, so this alone
+            # does not prove anything was stored). Without a save response (e.g. the form was
+            # posted as a page load), reload and read the state the server has stored instead
+            try:
+                if save_response is None:
+                    await page.reload(wait_until="domcontentloaded", timeout=30000)
+                    state = await self.read_toggle_state(page, timeout=15000)
+                else:
+                    state = await self.read_toggle_state(page, timeout=5000)
+            except PlaywrightTimeoutError:
+                result['message'] = 'Toggle element not found after save'
+                return result
+            state_after = state['checked']
             result['toggle_state_after'] = 'ON' if state_after else 'OFF'
             logger.info(f"Toggle state after: {result['toggle_state_after']}")
 
-            # Determine success based on achieving desired state
-            if state_after == desired_checked:
+            # Success needs the server to have accepted the save (or the reloaded page to show it),
+            # and the toggle in the desired state
+            if save_response is None:
+                if state_after == desired_checked:
+                    result['status'] = 'success'
+                    result['message'] = (f'Toggle set to {desired_state.upper()} (was {result["toggle_state_before"]}; '
+                                         'confirmed after reload)')
+                else:
+                    result['status'] = 'failed'
+                    result['message'] = f'Save not stored: the toggle shows {result["toggle_state_after"]} after reload'
+            elif not save_response.ok:
+                result['status'] = 'failed'
+                result['message'] = f'Save rejected by the server (HTTP {save_response.status})'
+            elif state_after == desired_checked:
                 result['status'] = 'success'
                 result['message'] = f'Toggle set to {desired_state.upper()} (was {result["toggle_state_before"]})'
             else:
@@ -367,134 +608,135 @@ class ToggleAutomation:
 
         return result
 
-    def process_batch(self, df_batch, batch_num, total_batches, start_idx, total_urls):
-        """Process a batch of URLs."""
-        print(f"\n    Processing batch {batch_num}/{total_batches} ({len(df_batch)} URLs)...")
-
-        pages = []
-        urls = []
-        userids = []
-        processed_count = 0
-
-        # Open all URLs in this batch
-        for batch_idx, (idx, row) in enumerate(df_batch.iterrows()):
-            url_short = row['url'].split('/')[-1]
-            current_num = start_idx + batch_idx + 1
-            print_progress(current_num, total_urls, url_short, "Opening...")
+    async def process_url(self, page_pool: asyncio.Queue, url: str, url_short: str, userid, total_urls: int,
+                          loaded_page=None):
+        """Set the toggle for a URL on a tab borrowed from the page pool and record the result.
+        loaded_page is a tab that was already opened on this URL (the login tab, for the first URL)."""
+        page = await page_pool.get()
 
+        try:
+            print_progress(len(self.results), total_urls, url_short, "Opening...")
             try:
-                page = self.context.new_page()
-                page.goto(row['url'], wait_until="domcontentloaded", timeout=120000)
-                pages.append(page)
-                urls.append(row['url'])
-                userids.append(row['userid'])
+                # Only the login tab, for the first URL, may skip reloading it (any other tab showing
+                # the same URL holds an older DOM). Return once navigation commits; waiting for the
+                # toggle is the real readiness check
+                if page is not loaded_page or page.url != url:
+                    await page.goto(url, wait_until="commit", timeout=120000)
                 logger.info(f"Opened: {url_short}")
             except Exception as e:
                 # If page fails to open, record error and continue
                 logger.error(f"Failed to open {url_short}: {str(e)}")
-                self.results.append({
-                    'url': row['url'],
-                    'userid': row['userid'],
+                self.record_result({
+                    'url': url,
+                    'userid': userid,
                     'status': 'error',
                     'desired_state': self.state,
                     'toggle_state_before': 'UNKNOWN',
                     'toggle_state_after': 'UNKNOWN',
-                    'message': f'Failed to open page: {str(e)[:100]}',
-                    'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'message': f'Failed to open page: {str(e)[:100]}'
                 })
-                processed_count += 1
-                continue
-
-        # Wait for all pages to load
-        if pages:
-            print(f"\n    Waiting for {len(pages)} pages to load...")
-            for page in pages:
-                try:
-                    page.wait_for_load_state("networkidle", timeout=30000)
-                except Exception:
-                    pass
-
-        # Process each page
-        for idx, (page, url, userid) in enumerate(zip(pages, urls, userids)):
-            url_short = url.split('/')[-1]
-            current_num = start_idx + processed_count + idx + 1
-            print_progress(current_num, total_urls, url_short, "Processing...")
+                print_progress(len(self.results), total_urls, url_short, "FAIL")
+                return
 
             try:
-                page.bring_to_front()
-                page.wait_for_timeout(500)
-
-                result = self.set_toggle_state(page, url, self.state)
+                result = await self.set_toggle_state(page, url, self.state)
                 result['userid'] = userid
 
-                self.results.append(result)
+                self.record_result(result)
 
                 status_symbol = "OK" if result['status'] == 'success' else "FAIL"
-                print_progress(current_num, total_urls, url_short, status_symbol)
+                print_progress(len(self.results), total_urls, url_short, status_symbol)
                 logger.info(f"Result for {url_short}: {result['status']} - {result['message']}")
 
             except Exception as e:
                 logger.error(f"Error processing {url_short}: {str(e)}")
-                self.results.append({
+                self.record_result({
                     'url': url,
                     'userid': userid,
                     'status': 'error',
                     'desired_state': self.state,
                     'toggle_state_before': 'UNKNOWN',
                     'toggle_state_after': 'UNKNOWN',
-                    'message': f'Error: {str(e)[:100]}',
-                    'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'message': f'Error: {str(e)[:100]}'
                 })
-            finally:
-                try:
-                    page.close()
-                except Exception:
-                    pass
+        finally:
+            # Return the tab to the pool (replace it if it crashed or was closed)
+            if page.is_closed():
+                page = await page.context.new_page()
+            page_pool.put_nowait(page)
+
+    def record_error(self, url: str, userid, message: str):
+        """Record a URL that could not be processed at all."""
+        self.record_result({
+            'url': url,
+            'userid': userid,
+            'status': 'error',
+            'desired_state': self.state,
+            'toggle_state_before': 'UNKNOWN',
+            'toggle_state_after': 'UNKNOWN',
+            'message': message
+        })
 
-        print()  # New line after progress bar
+    def record_result(self, result: dict):
+        """Timestamp a result, keep it for the report and append it to the CSV right away."""
+        result['updated_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.results.append(result)
+        if self.results_writer:
+            self.results_writer.writerow(result)
 
     def run(self):
-        """Main execution method with batch processing."""
+        """Main execution method."""
+        # uvloop's faster event loop when it is installed (not available on Windows);
+        # uvloop.run only exists from uvloop 0.18, older versions fall back to asyncio
+        (getattr(uvloop, "run", None) or asyncio.run)(self.run_async())
+
+    async def run_async(self):
+        """Main execution method."""
         self.start_time = datetime.now()
-        df = self.load_excel()
+        # Several Excel files share one browser launch (and one login per userid)
+        rows = [row for excel_path in self.excel_paths for row in self.load_excel(excel_path)]
 
-        if len(df) == 0:
+        if not rows:
             print_status("No URLs found in Excel file!", "!!")
             return
 
-        total_urls = len(df)
-        total_batches = (total_urls + BATCH_SIZE - 1) // BATCH_SIZE
+        total_urls = len(rows)
+
+        # Group rows by login, keeping the Excel order. Each login gets its own context, so
+        # sessions never mix, and the logins are processed in parallel. Only as many logins
+        # as fit in --max-pages hold tabs at once, so the total tab count stays within it
+        accounts = {}
+        for row in rows:
+            accounts.setdefault(row[2], []).append(row)
+        active_accounts = min(len(accounts), self.max_pages)
+        pages_per_account = max(1, self.max_pages // active_accounts)
+        self.account_slots = asyncio.Semaphore(active_accounts)
+        self.login_slots = asyncio.Semaphore(MAX_PARALLEL_LOGINS)
 
         print_status(f"TOGGLE AUTOMATION - Setting {total_urls} URLs to {self.state}", "=")
-        print(f"    Processing in {total_batches} batches of up to {BATCH_SIZE} URLs each")
+        print(f"    Processing up to {self.max_pages} URLs at a time")
+        if len(accounts) > 1:
+            print(f"    {len(accounts)} logins, {active_accounts} at a time with up to {pages_per_account} URLs each")
+            if self.profile_dir:
+                # A browser profile holds a single login
+                print("    --profile-dir ignored: the Excel file has more than one userid")
+                self.profile_dir = None
+        if self.profile_dir:
+            # One profile per login, so a profile never starts out logged in as someone else
+            self.profile_dir = str(Path(self.profile_dir) / login_key(rows[0][2]))
+
+        # Line-buffered, so every finished URL reaches the disk immediately
+        self.results_csv = open(RESULTS_CSV, 'w', newline='', encoding='utf-8', buffering=1)
+        self.results_writer = csv.DictWriter(self.results_csv, fieldnames=RESULT_FIELDS)
+        self.results_writer.writeheader()
 
         try:
-            with sync_playwright() as p:
+            async with async_playwright() as p:
                 # Launch browser
                 print_status("Starting browser...", ">>")
-                browser_name = None
-
-                try:
-                    self.browser = p.chromium.launch(headless=self.headless)
-                    browser_name = "Chromium"
-                except Exception:
-                    pass
-
-                if not self.browser:
-                    try:
-                        self.browser = p.chromium.launch(headless=self.headless, channel="chrome")
-                        browser_name = "Chrome"
-                    except Exception:
-                        pass
+                browser_name = await self.launch_browser(p)
 
-                if not self.browser:
-                    try:
-                        self.browser = p.firefox.launch(headless=self.headless)
-                        browser_name = "Firefox"
-                    except Exception:
-                        pass
-
-                if not self.browser:
+                if not browser_name:
                     print_status("ERROR: No browser available!", "!!")
                     logger.error("No browser available")
                     return
@@ -502,61 +744,170 @@ class ToggleAutomation:
                 print(f"    Using: {browser_name}")
                 logger.info(f"Using browser: {browser_name}")
 
-                # Create single context (session) for all operations
-                self.context = self.browser.new_context()
-
-                # Step 1: Login using first URL
-                print_status("Step 1: Logging in...", ">>")
-                first_row = df.iloc[0]
-
-                first_page = self.context.new_page()
-                try:
-                    first_page.goto(first_row['url'], wait_until="domcontentloaded", timeout=120000)
-                    first_page.wait_for_load_state("networkidle", timeout=30000)
-                except Exception as e:
-                    logger.info(f"Page load timeout, continuing: {str(e)}")
-
-                if self.is_login_page(first_page):
-                    if not self.login(first_page, first_row['userid'], first_row['password']):
-                        print_status("Login FAILED! Please check credentials.", "!!")
-                        self.context.close()
-                        self.browser.close()
-                        return
-                else:
-                    print("    Already logged in (session active)")
-
-                first_page.close()
-                print_status("Login complete - Session established", "OK")
-
-                # Step 2: Process URLs in batches
-                print_status(f"Step 2: Processing {total_urls} URLs in batches...", ">>")
-
-                for batch_num in range(total_batches):
-                    start_idx = batch_num * BATCH_SIZE
-                    end_idx = min(start_idx + BATCH_SIZE, total_urls)
-                    df_batch = df.iloc[start_idx:end_idx]
-
-                    self.process_batch(df_batch, batch_num + 1, total_batches, start_idx, total_urls)
-
-                self.context.close()
-                self.browser.close()
+                print_status(f"Processing {total_urls} URLs...", ">>")
+
+                # A failing login must not stop the others, so collect errors instead of raising
+                outcomes = await asyncio.gather(*[self.run_account(account_rows, pages_per_account, total_urls)
+                                                  for account_rows in accounts.values()],
+                                                return_exceptions=True)
+                print()  # New line after progress bar
+                # URLs of a login that failed part-way still belong in the report
+                recorded = Counter((r['url'], r['userid']) for r in self.results)
+                for account_rows, outcome in zip(accounts.values(), outcomes):
+                    if isinstance(outcome, Exception):
+                        userid = account_rows[0][2]
+                        print_status(f"ERROR for {userid}: {str(outcome)}", "!!")
+                        logger.error(f"Error for {userid}: {str(outcome)}")
+                        for url, _, _, _ in account_rows:
+                            if recorded[(url, userid)]:
+                                recorded[(url, userid)] -= 1
+                            else:
+                                self.record_error(url, userid, f'Error: {str(outcome)[:100]}')
+
+                await self.close_browser()
 
         except Exception as e:
             print_status(f"UNEXPECTED ERROR: {str(e)}", "!!")
             logger.error(f"Unexpected error: {str(e)}")
             # Try to close browser on error
             try:
-                if self.context:
-                    self.context.close()
-                if self.browser:
-                    self.browser.close()
+                await self.close_browser()
             except Exception:
                 pass
         finally:
             # Always save results, even if there was an error
+            self.results_csv.close()
+            self.results_writer = None
             self.save_results()
             self.print_summary()
 
+    async def run_account(self, rows: list, max_pages: int, total_urls: int):
+        """Log in as one userid in its own context and process that login's URLs."""
+        first_url, _, userid, password = rows[0]
+        session_file = session_file_for(userid)
+
+        # Hold one of the login slots (and its share of --max-pages tabs) until this login is done
+        async with self.account_slots:
+            context = None
+            try:
+                # Create the context (session) for this login
+                if self.profile_dir:
+                    context = self.contexts[0]  # the persistent profile opened by launch_browser
+                    print(f"    Using browser profile: {self.profile_dir}")
+                else:
+                    if not self.fresh_login and self.has_fresh_session(session_file):
+                        print(f"    Restoring saved session for: {userid}")
+                        context = await self.browser.new_context(storage_state=session_file)
+                    else:
+                        context = await self.browser.new_context()
+                    self.contexts.append(context)
+                await context.route("**/*", block_unneeded_requests)
+                await context.add_init_script(PENDO_BLOCK_JS)
+                context.on("dialog", handle_dialog)
+
+                # Step 1: Login using the first URL of this login
+                if self.profile_dir and context.pages:
+                    first_page = context.pages[0]  # the tab a persistent context opens with
+                else:
+                    first_page = await context.new_page()
+                first_page_kind = None
+                try:
+                    await first_page.goto(first_url, wait_until="domcontentloaded", timeout=120000)
+                    if is_login_url(first_page.url):
+                        first_page_kind = 'login'  # the server already redirected to the login page
+                    else:
+                        # One page-side wait tells whether the session is valid (toggle) or a login is needed
+                        handle = await first_page.wait_for_function(
+                            FIRST_PAGE_KIND_JS, arg={'label': TOGGLE_LABEL, 'loginSelector': LOGIN_INDICATORS_SELECTOR},
+                            polling=250, timeout=30000)
+                        first_page_kind = await handle.json_value()
+                except Exception as e:
+                    logger.info(f"Page load timeout, continuing: {str(e)}")
+
+                # The login heuristic only runs if the page never settled on either
+                if first_page_kind == 'login' or (first_page_kind is None and await self.is_login_page(first_page)):
+                    # Any saved session for this login is stale now; drop it so a failed login can't reuse it
+                    Path(session_file).unlink(missing_ok=True)
+                    async with self.login_slots:
+                        logged_in = await self.login(first_page, userid, password)
+                    if not logged_in:
+                        print_status(f"Login FAILED for {userid}! Please check credentials.", "!!")
+                        # Report this login's URLs instead of dropping them
+                        for url, _, _, _ in rows:
+                            self.record_error(url, userid, 'Login failed')
+                        return
+                    await context.storage_state(path=session_file)
+                    # The session holds login cookies, so keep it private to this user
+                    os.chmod(session_file, 0o600)
+                    logger.info(f"Session saved to: {session_file}")
+                else:
+                    print(f"    Already logged in as: {userid} (session active)")
+
+                # Routes added later take precedence over the catch-all route
+                await context.route(RECAPTCHA_URL_PATTERN, abort_request)
+                logger.info(f"Login complete for {userid}")
+
+                # Reuse a fixed pool of tabs for this login's URLs. The login tab goes in first, so the
+                # first URL (which it may already show) gets it; the extra tabs are opened concurrently
+                page_pool = asyncio.Queue()
+                page_pool.put_nowait(first_page)
+                extra_pages = await asyncio.gather(*[context.new_page()
+                                                     for _ in range(min(max_pages, len(rows)) - 1)])
+                for page in extra_pages:
+                    page_pool.put_nowait(page)
+
+                # Step 2: Process this login's URLs; the page pool limits how many run at once
+                await asyncio.gather(*[self.process_url(page_pool, url, url_short, userid, total_urls,
+                                                        first_page if index == 0 else None)
+                                       for index, (url, url_short, userid, _) in enumerate(rows)])
+            finally:
+                # Free this login's tabs for the next one (the persistent profile is closed at the end)
+                if context and not self.profile_dir:
+                    await context.close()
+
+    async def launch_browser(self, p):
+        """Launch the first installed browser (Chromium, then Chrome, then Firefox), or open the
+        persistent profile with the first engine that works. Returns its name."""
+        # Only try engines whose binaries are installed, so a missing one costs nothing.
+        # Chrome is a system install whose location Playwright resolves itself.
+        launchers = []
+        if os.path.exists(p.chromium.executable_path):
+            launchers.append(("Chromium", p.chromium, {"args": self.launch_args}))
+        launchers.append(("Chrome", p.chromium, {"channel": "chrome", "args": self.launch_args}))
+        if os.path.exists(p.firefox.executable_path):
+            launchers.append(("Firefox", p.firefox, {}))
+
+        if self.profile_dir:
+            # A profile belongs to one engine: never retry another one on the same folder
+            # (e.g. when the profile is locked by a running instance)
+            launchers = launchers[:1]
+
+        for name, browser_type, options in launchers:
+            try:
+                if self.profile_dir:
+                    # The persistent context owns its browser; self.browser stays None
+                    self.contexts.append(await browser_type.launch_persistent_context(
+                        self.profile_dir, headless=self.headless, **options))
+                else:
+                    self.browser = await browser_type.launch(headless=self.headless, **options)
+                return name
+            except Exception as e:
+                logger.info(f"Could not launch {name}: {str(e)}")
+
+        return None
+
+    async def close_browser(self):
+        """Close the contexts and the browser (a persistent profile has no separate browser)."""
+        for context in self.contexts:
+            await context.close()
+        if self.browser:
+            await self.browser.close()
+
+    def has_fresh_session(self, session_file: str) -> bool:
+        """Check whether a saved login session exists and is recent enough to reuse."""
+        session = Path(session_file)
+        return session.exists() and time.time() - session.stat().st_mtime < SESSION_MAX_AGE_HOURS * 3600
+
     def save_results(self):
         """Save results to Excel (overwrites previous file)."""
         if not self.results:
@@ -564,8 +915,17 @@ class ToggleAutomation:
             return
 
         output_file = "toggle_results.xlsx"
-        results_df = pd.DataFrame(self.results)
-        results_df.to_excel(output_file, index=False)
+
+        # Stream rows straight into a write-only workbook
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Results")
+        ws.append(RESULT_FIELDS)
+        for r in self.results:
+            ws.append([r.get(col) for col in RESULT_FIELDS])
+        wb.save(output_file)
+
+        # The Excel report now holds everything the partial CSV did
+        Path(RESULTS_CSV).unlink(missing_ok=True)
 
         print_status(f"Results saved to: {output_file}", ">>")
         logger.info(f"Results saved to: {output_file}")
@@ -591,10 +951,11 @@ class ToggleAutomation:
             return
 
         total = len(self.results)
-        success = sum(1 for r in self.results if r['status'] == 'success')
-        failed = sum(1 for r in self.results if r['status'] == 'failed')
-        errors = sum(1 for r in self.results if r['status'] == 'error')
-        skipped = sum(1 for r in self.results if r['status'] == 'skipped')
+        counts = Counter(r['status'] for r in self.results)
+        success = counts['success']
+        failed = counts['failed']
+        errors = counts['error']
+        skipped = counts['skipped']
 
         # Calculate duration
         end_time = datetime.now()
@@ -644,26 +1005,44 @@ def main():
     print("=" * 60)
 
     parser = argparse.ArgumentParser(description='Automated Toggle Script')
-    parser.add_argument('excel_file', help='Path to Excel file with URLs and credentials')
+    parser.add_argument('excel_files', nargs='+', metavar='excel_file',
+                        help='Path to Excel file with URLs and credentials (several files run in one browser)')
     parser.add_argument('--state', required=True, choices=['ON', 'OFF', 'on', 'off'],
                         help='Desired toggle state: ON or OFF')
     parser.add_argument('--headless', action='store_true', default=True,
                         help='Run browser in headless mode (default: True)')
     parser.add_argument('--no-headless', action='store_false', dest='headless',
                         help='Run browser with visible window')
+    parser.add_argument('--fresh-login', action='store_true',
+                        help='Ignore the saved login session and log in again')
+    parser.add_argument('--launch-args', type=shlex.split, default=None,
+                        help='Chromium command-line flags to use instead of the built-in set '
+                             '(one quoted string, e.g. --launch-args="--disable-gpu --no-sandbox")')
+    parser.add_argument('--dismiss-popups', action='store_true',
+                        help='Also try to close Pendo popups before each click (only needed if they still appear)')
+    parser.add_argument('--profile-dir', nargs='?', const=str(DEFAULT_PROFILE_DIR), default=None,
+                        help='Keep a browser profile per login between runs (cookies, cache) in this folder '
+                             f'(default when given without a path: {DEFAULT_PROFILE_DIR})')
+    parser.add_argument('--max-pages', type=int, default=MAX_PARALLEL_PAGES,
+                        help=f'Number of URLs processed at the same time (default: {MAX_PARALLEL_PAGES})')
 
     args = parser.parse_args()
 
-    if not Path(args.excel_file).exists():
-        print_status(f"ERROR: Excel file not found: {args.excel_file}", "!!")
-        return
+    for excel_file in args.excel_files:
+        if not Path(excel_file).exists():
+            print_status(f"ERROR: Excel file not found: {excel_file}", "!!")
+            return
 
     try:
-        automation = ToggleAutomation(args.excel_file, args.state, args.headless)
+        automation = ToggleAutomation(args.excel_files, args.state, args.headless, args.max_pages,
+                                      args.fresh_login, args.launch_args, args.dismiss_popups, args.profile_dir)
         automation.run()
     except Exception as e:
         print_status(f"FATAL ERROR: {str(e)}", "!!")
         logger.error(f"Fatal error: {str(e)}")
+    finally:
+        # Write out any queued log records
+        log_listener.stop()
 
     # Beep to notify completion
     print("\a")
@@ -25,7 +25,6 @@ if not exist "output" mkdir output
 REM Create requirements.txt if not exists
 if not exist "_system\scripts\requirements.txt" (
     echo playwright>=1.40.0> _system\scripts\requirements.txt
-    echo pandas>=2.0.0>> _system\scripts\requirements.txt
     echo openpyxl>=3.1.0>> _system\scripts\requirements.txt
 )
 
@@ -37,7 +36,7 @@ call _system\venv\Scripts\activate.bat
 
 echo Installing dependencies...
 pip install --upgrade pip
-pip install playwright pandas openpyxl
+pip install playwright openpyxl
 
 echo Installing Playwright browsers...
 playwright install chromium
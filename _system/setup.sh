@@ -27,7 +27,7 @@ source _system/venv/bin/activate
 
 echo "Installing dependencies..."
 pip install --upgrade pip
-pip install playwright pandas openpyxl
+pip install playwright openpyxl
 
 echo "Installing Playwright browsers..."
 playwright install chromium